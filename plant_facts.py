@@ -1,26 +1,46 @@
 from openai import OpenAI
-from gtts import gTTS
-from io import BytesIO
 import streamlit as st
 from streamlit_searchbox import st_searchbox
 import base64
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
 import redis
-import re
+from plant_text import canonical_plant_name, clean_text_for_tts
 
 # Set page config to wide mode
 st.set_page_config(layout="wide")
 
+# Streamlit re-executes this script on every interaction, so shared clients are
+# created through st.cache_resource to keep them (and their connection pools) across reruns
+
 # Initialize OpenAI client
-client = OpenAI()
+@st.cache_resource
+def get_openai_client():
+    return OpenAI()
 
 # Connect to Redis instance
-r = redis.Redis(host=st.secrets["REDIS_HOST"], port=st.secrets["REDIS_PORT"], password=st.secrets["REDIS_PASSWORD"], decode_responses=True)
+@st.cache_resource
+def get_redis_connection():
+    return redis.Redis(host=st.secrets["REDIS_HOST"], port=st.secrets["REDIS_PORT"], password=st.secrets["REDIS_PASSWORD"], decode_responses=True)
+
+# Pooled HTTP session, so suggestion lookups reuse connections instead of reconnecting per keystroke
+@st.cache_resource
+def get_http_session():
+    session = requests.Session()
+    session.headers["User-Agent"] = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/70.0.3538.102 Safari/537.36 Edge/18.19582"
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=Retry(total=1, read=False, backoff_factor=0.2))
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+client = get_openai_client()
+r = get_redis_connection()
 
 # Instruction paragraph with FontAwesome CSS included
-st.markdown(
-    """
+HEADER_HTML = """
+    <link rel="preconnect" href="https://cdnjs.cloudflare.com" crossorigin>
     <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/5.15.1/css/all.min.css">
     <div style="display:flex;align-items:center">
         <i class="fas fa-seedling" style="font-size:48px; margin-right: 10px;"></i>
@@ -29,23 +49,36 @@ st.markdown(
             <p>This app uses AI to provide detailed information and facts about your plants.</p>
         </div>
     </div>
-    """,
-    unsafe_allow_html=True
-)
+    """
+# Emitted on every run: Streamlit drops elements a rerun doesn't emit again
+st.markdown(HEADER_HTML, unsafe_allow_html=True)
 
 # UI for selecting input method
 input_method = st.radio("Select Input Method", ("Search Box", "File Upload", "Camera Capture"))
+mute_audio = st.checkbox("Reset & Don't Load Audio", value=True)
+
+# Prompt used to identify the plant in an uploaded or captured image
+IDENTIFY_PLANT_PROMPT = {
+    "type": "text",
+    "text": """Reply with only the plant name and its scientific name. Example: Chinese Rose (Rosa chinensis)"""
+}
+
+# Fetch Google's completions for a query; cached so retyping or deleting
+# characters doesn't repeat the request. Failures raise and aren't cached.
+@st.cache_data(ttl=3600, max_entries=1024, show_spinner=False)
+def fetch_search_suggestions(query):
+    # Use '/complete/' with the 'client' parameter; requests URL-encodes the query
+    url = "https://www.google.com/complete/search"
+    params = {"client": "chrome", "q": query}
+    # Fail fast on an unreachable host so the search box falls back to the typed query; reads aren't
+    # retried, so a stalled response gives up after 4 s
+    response = get_http_session().get(url, params=params, timeout=(1.5, 4))
+    return json.loads(response.text)[1]
 
 # Define the function for getting search suggestions with extra flexibility
 def get_search_suggestions(query, **kwargs):
     try:
-        # Add '/complete/' and 'client' parameter to the search URL
-        url = f"http://google.com/complete/search?client=chrome&q={query}"
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/70.0.3538.102 Safari/537.36 Edge/18.19582"
-        }
-        response = requests.get(url, headers=headers)
-        results = json.loads(response.text)[1]
+        results = fetch_search_suggestions(query)
 
         # Insert the user input as the first option
         results.insert(0, query)
@@ -55,14 +88,24 @@ def get_search_suggestions(query, **kwargs):
         print(e)
         return []
 
-# Function to retrieve plant analysis from OpenAI
-def get_analysis(plant_name):
-    key = f'plant:{plant_name}'
+# Function to retrieve plant analysis from OpenAI; Redis shares analyses between
+# processes, the in-memory cache skips the Redis round-trip when a rerun shows the same plant.
+# Only the canonical key is hashed (_plant_name is skipped), so name variants share one entry
+@st.cache_data(ttl=3600, max_entries=256, show_spinner=False)
+def fetch_analysis(plant_key, _plant_name):
+    key = f'plant:{plant_key}'
     result = r.get(key)
     if result is not None:
         return result
     else:
-        prompt = f"""Write a comprehensive and detailed report on the plant {plant_name}. Include the following information:
+        # Analyses cached before keys were canonicalized are stored under the raw name; move them over
+        legacy_key = f'plant:{_plant_name}'
+        result = r.get(legacy_key) if legacy_key != key else None
+        if result is not None:
+            r.set(key, result)
+            r.delete(legacy_key)
+            return result
+        prompt = f"""Write a comprehensive and detailed report on the plant {_plant_name}. Include the following information:
 1. **General Information**:
    - Common name
    - Scientific name
@@ -106,25 +149,55 @@ Make sure the report is detailed and easy to understand for both novice and expe
         r.set(key, analysis)
         return analysis
 
-def clean_text_for_tts(text):
-    text = re.sub(r'\*\*(.*?)\*\*', r'\1', text)  # Remove bold markdown
-    text = re.sub(r'\#\#(.*?)\n', r'\1. ', text)  # Translate headers to plain text
-    text = re.sub(r'\#(.*?)\n', r'\1. ', text)  # Ensure single hashes are also replaced
-    text = re.sub(r'\* (.*?)\n', r'\1. ', text)  # Translate markdown list items
-    text = re.sub(r'\[(.*?)\]\(.*?\)', r'\1', text)  # Remove markdown links, keeping link text
-    text = text.replace('|', ', ').replace('-', ' ').replace('`', '')  # Remove or replace other special characters
-    return text
+def get_analysis(plant_name):
+    return fetch_analysis(canonical_plant_name(plant_name), plant_name)
+
+# Function to identify the plant in an image with OpenAI; cached on the image bytes because
+# the uploaded or captured image stays in its widget and is re-processed on every rerun
+@st.cache_data(ttl=3600, max_entries=64, show_spinner=False)
+def identify_plant(image_bytes):
+    image_b64 = base64.b64encode(image_bytes).decode("utf-8")
+    response = client.chat.completions.create(
+        model="gpt-4o-mini",
+        messages=[
+            {
+                "role": "user",
+                "content": [IDENTIFY_PLANT_PROMPT,
+                            {
+                                "type": "image_url",
+                                "image_url": {
+                                    "url": f"data:image/jpeg;base64,{image_b64}",
+                                },
+                            },
+                           ],
+            }
+        ],
+        max_tokens=50,
+    )
+    return response.choices[0].message.content
+
+# Cache the generated speech so reruns don't clean the text or call Google TTS again
+@st.cache_data(ttl=3600, max_entries=128, show_spinner=False)
+def get_tts_audio(analysis):
+    # Imported here so muted sessions (the default) never load gtts
+    from gtts import gTTS
+    tts = gTTS(text=clean_text_for_tts(analysis), lang='en')
+    return b"".join(tts.stream())  # Join the MP3 chunks once instead of growing a BytesIO
 
 def display_analysis(analysis, mute_audio=True):
-    st.subheader("AI Analysis:")
-    st.write(analysis)
+    # Heading and body in one element, a single message to the browser per render
+    st.markdown(f"### AI Analysis:\n\n{analysis}")
 
     if not mute_audio:
-        clean_analysis = clean_text_for_tts(analysis)
-        audio_stream = BytesIO()
-        tts = gTTS(text=clean_analysis, lang='en')
-        tts.write_to_fp(audio_stream)
-        st.audio(audio_stream, format="audio/mpeg", start_time=0)
+        st.audio(get_tts_audio(analysis), format="audio/mpeg", start_time=0)
+
+# Identify the plant in an image, then show its analysis
+def display_image_analysis(image_bytes, mute_audio=True):
+    plant_name = identify_plant(image_bytes)
+    st.markdown(f"Plant:\n\n{plant_name}")  # Label and name as a single element
+
+    analysis = get_analysis(plant_name)
+    display_analysis(analysis, mute_audio=mute_audio)
 
 # Search Box/Input Method
 if input_method == "Search Box":
@@ -144,11 +217,10 @@ if input_method == "Search Box":
         key="plant_search",
     )
     search_button = st.button("Search")
-    mute_audio = st.checkbox("Reset & Don't Load Audio", value=True)
-    if search_button:
+    if search_button and plant_name and plant_name.strip():
         with st.spinner("Analyzing..."):
             analysis = get_analysis(plant_name)
-        display_analysis(analysis)
+        display_analysis(analysis, mute_audio=mute_audio)
 
 # File Upload/Input Method
 elif input_method == "File Upload":
@@ -164,37 +236,9 @@ elif input_method == "File Upload":
     if uploaded_image:
         with st.spinner("Processing..."):
             image_bytes = uploaded_image.read()
-            image_b64 = base64.b64encode(image_bytes).decode("utf-8")
             st.image(image_bytes, caption='Uploaded Image', width=300)
             
-            user_message_content = {
-                "type": "text",
-                "text": """Reply with only the plant name and its scientific name. Example: Chinese Rose (Rosa chinensis)"""
-            }
-            
-            response = client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [user_message_content,
-                                    {
-                                        "type": "image_url",
-                                        "image_url": {
-                                            "url": f"data:image/jpeg;base64,{image_b64}",
-                                        },
-                                    },
-                                   ],
-                    }
-                ],
-                max_tokens=50,
-            )
-            plant_name = response.choices[0].message.content
-            st.write("Plant:")
-            st.write(plant_name)
-            
-            analysis = get_analysis(plant_name)
-            display_analysis(analysis)
+            display_image_analysis(image_bytes, mute_audio=mute_audio)
 
 # Camera Capture/Input Method
 elif input_method == "Camera Capture":
@@ -210,44 +254,11 @@ elif input_method == "Camera Capture":
     if captured_image:
         with st.spinner("Processing..."):
             image_bytes = captured_image.read()
-            image_b64 = base64.b64encode(image_bytes).decode("utf-8")
-            
-            user_message_content = {
-                "type": "text",
-                "text": """Reply with only the plant name and its scientific name. Example: Chinese Rose (Rosa chinensis)"""
-            }
-            
-            response = client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [user_message_content,
-                                    {
-                                        "type": "image_url",
-                                        "image_url": {
-                                            "url": f"data:image/jpeg;base64,{image_b64}",
-                                        },
-                                    },
-                                   ],
-                    }
-                ],
-                max_tokens=50,
-            )
-            
-            plant_name = response.choices[0].message.content
-            st.write("Plant:")
-            st.write(plant_name)
-
-            analysis = get_analysis(plant_name)
-            display_analysis(analysis)
+            display_image_analysis(image_bytes, mute_audio=mute_audio)
 
 
-st.divider()
-expander = st.expander("Legal and Data Privacy Statement", expanded=False)
-with expander:
-    st.markdown(
-    """
+# Legal and Data Privacy Statement, pure HTML
+LEGAL_HTML = """
 <p style="font-size:14px;">Legal Statement</p>
 <p style="font-size:14px;">
 This application ("App") is provided "as is" without any warranties, express or implied. The information provided by the App is intended to be used for informational purposes only and not as a substitute for professional advice, diagnosis, or treatment. Always seek the advice of your qualified info provider with any questions you may have regarding a plant. Never disregard professional advice or delay in seeking it because of something you have read on the App.
@@ -293,6 +304,10 @@ This application ("App") respects your privacy. This statement outlines our prac
 <b>Ownership of Data:</b> All output data generated by the App, including but not limited to the analysis of plant information, belongs to the owner of the App. The owner retains the right to use, reproduce, distribute, display, and perform the data in any manner and for any purpose. The user acknowledges and agrees that any information input into the App may be used in this way, subject to the limitations set out in the Data Privacy Statement.
 </p>
 
-    """,
-    unsafe_allow_html=True,
-)
+    """
+
+st.divider()
+expander = st.expander("Legal and Data Privacy Statement", expanded=False)
+with expander:
+    # Pure HTML, so render it directly instead of through the markdown parser
+    st.html(LEGAL_HTML)
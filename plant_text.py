@@ -0,0 +1,30 @@
+# Pure text helpers used by plant_facts.py, kept free of Streamlit so they can be tested directly
+
+import re
+
+# Case, punctuation and spacing variants of a name share one cached analysis
+PLANT_KEY_PUNCTUATION_PATTERN = re.compile(r'[^\w\s]+')
+
+def canonical_plant_name(plant_name):
+    canonical = ' '.join(PLANT_KEY_PUNCTUATION_PATTERN.sub(' ', plant_name.casefold()).split())
+    return canonical or plant_name.strip()  # Names made only of punctuation keep their own key
+
+# Markdown constructs stripped before TTS: bold, headers, list items and links
+# Headers only match from the first '#' of a run, and their text can't start with '#', so an
+# unterminated run of hashes fails in linear time instead of backtracking through every split
+TTS_MARKDOWN_PATTERN = re.compile(r'\*\*(.*?)\*\*|(?<!#)#+([^#\n][^\n]*|)\n|\* ([^\n]*)\n|\[(.*?)\]\([^)]*\)')
+
+# Table values may be longer than one character, so all three replacements happen in one pass
+TTS_CHARACTER_TABLE = str.maketrans({'|': ', ', '-': ' ', '`': None})
+
+def replace_tts_markdown(match):
+    # Clean the captured text too, so bold or links inside headers and list items are handled
+    text = TTS_MARKDOWN_PATTERN.sub(replace_tts_markdown, match.group(match.lastindex))
+    if match.lastindex in (2, 3):
+        return text + '. '  # Headers and list items become sentences
+    return text
+
+def clean_text_for_tts(text):
+    text = TTS_MARKDOWN_PATTERN.sub(replace_tts_markdown, text)  # One scan of the text; only matched spans are re-scanned
+    text = text.translate(TTS_CHARACTER_TABLE)  # Remove or replace other special characters
+    return text
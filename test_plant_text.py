@@ -0,0 +1,40 @@
+from plant_text import TTS_MARKDOWN_PATTERN, canonical_plant_name, clean_text_for_tts
+
+
+def test_strips_bold_headers_lists_and_links():
+    text = "## 1. **General Information**\n* Bullet with [a link](http://x.y/z) here\n"
+    assert clean_text_for_tts(text) == " 1. General Information. Bullet with a link here. "
+
+
+def test_replaces_special_characters():
+    assert clean_text_for_tts("| a | b |\nUse `code` and well-drained soil.") == ",  a ,  b , \nUse code and well drained soil."
+
+
+def test_plain_text_is_unchanged():
+    assert clean_text_for_tts("Water weekly.\nKeep in bright light.") == "Water weekly.\nKeep in bright light."
+
+
+def test_deep_header_does_not_swallow_next_line():
+    # Any run of '#' is a header, so the following list item is left as its own line
+    assert clean_text_for_tts("### Care\n- item\n") == " Care.   item\n"
+
+
+def test_unterminated_hash_run_is_left_alone():
+    # Used to backtrack through every split of the run; it now fails each position immediately
+    text = "#" * 20000 + " no newline"
+    assert TTS_MARKDOWN_PATTERN.search(text) is None
+    assert clean_text_for_tts(text) == text
+
+
+def test_plant_name_variants_share_a_cache_key():
+    variants = ["Snake Plant", " snake plant ", "snake-plant", "SNAKE  PLANT!"]
+    assert {canonical_plant_name(name) for name in variants} == {"snake plant"}
+
+
+def test_canonical_plant_name_keeps_scientific_name_words():
+    assert canonical_plant_name("Chinese Rose (Rosa chinensis)") == "chinese rose rosa chinensis"
+
+
+def test_punctuation_only_names_keep_distinct_keys():
+    assert canonical_plant_name("!!!") == "!!!"
+    assert canonical_plant_name("!!!") != canonical_plant_name("???")